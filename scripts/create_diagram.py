@@ -8,9 +8,131 @@ import argparse
 import json
 import math
 import sys
+from html import escape
 from pathlib import Path
 
 
+# SVG fragment templates (bytes, filled with %-formatting in the chart loops)
+_SVG_OPEN_TMPL = b'<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" viewBox="0 0 %d %d">\n'
+_BACKGROUND_TMPL = b'<rect width="%d" height="%d" fill="%s"/>\n'
+_TITLE_TMPL = b'<text x="%s" y="%d" text-anchor="middle" class="title">%s</text>\n'
+
+_BAR_ROW_TMPL = (
+    b'<text x="%d" y="%s" text-anchor="end" class="label">%s</text>\n'
+    b'<rect x="%d" y="%d" width="%d" height="%d" fill="#f3f4f6" class="bar"/>\n'
+)
+_BAR_FILL_TMPL = b'<rect x="%d" y="%d" width="%s" height="%d" fill="%s" class="bar"/>\n'
+_BAR_VALUE_TMPL = b'<text x="%s" y="%s" class="value">%s%s</text>\n'
+
+_PIE_SLICE_TMPL = b'<path d="M %d,%d L %s,%s A %d,%d 0 %d,1 %s,%s Z" fill="%s" stroke="#ffffff" stroke-width="2"/>\n'
+_PIE_CIRCLE_TMPL = b'<path d="M %d,%d A %d,%d 0 1,1 %d,%d A %d,%d 0 1,1 %d,%d Z" fill="%s" stroke="#ffffff" stroke-width="2"/>\n'
+_PIE_LEGEND_TMPL = (
+    b'<rect x="%d" y="%d" width="16" height="16" fill="%s" rx="2"/>\n'
+    b'<text x="%d" y="%d" class="legend-label">%s</text>\n'
+    b'<text x="%d" y="%d" class="legend-value">%.1f%%</text>\n'
+)
+
+_STAT_CARD_TMPL = (
+    b'<rect x="%d" y="%d" width="%d" height="%d" class="card"/>\n'
+    b'<text x="%s" y="%d" text-anchor="middle" class="stat-value">%s</text>\n'
+    b'<text x="%s" y="%d" text-anchor="middle" class="stat-label">%s</text>\n'
+)
+_STAT_DESC_TMPL = b'<text x="%s" y="%d" text-anchor="middle" class="stat-desc">%s</text>\n'
+
+_TABLE_ROW_BG_TMPL = b'<rect x="%d" y="%d" width="%d" height="%d" fill="#ecf0f1"/>\n'
+_TABLE_HEADER_BG_TMPL = b'<rect x="%d" y="%d" width="%d" height="%d" fill="#3498db" opacity="0.2"/>\n'
+_TABLE_GRID_TMPL = b'<rect x="%d" y="%d" width="%d" height="%d" fill="none" stroke="#bdc3c7"/>\n'
+_TABLE_HEADER_TMPL = b'<text x="%d" y="%d" class="header">%s</text>\n'
+_TABLE_CELL_TMPL = b'<text x="%d" y="%d" class="cell">%s</text>\n'
+
+_FLOW_BOX_TMPL = (
+    b'<rect x="%d" y="%d" width="%d" height="%d" class="box"/>\n'
+    b'<text x="%s" y="%s" class="text">%s</text>\n'
+)
+_FLOW_ARROW_TMPL = b'<line x1="%s" y1="%d" x2="%s" y2="%d" class="arrow"/>\n'
+
+# Per-chart <style> blocks, built once at import
+_BAR_STYLE = (
+    b'<style>\n'
+    b'  .title { font-family: Inter, Arial, sans-serif; font-size: 18px; font-weight: 600; fill: #1a1a1a; }\n'
+    b'  .label { font-family: Inter, Arial, sans-serif; font-size: 13px; fill: #374151; }\n'
+    b'  .value { font-family: Inter, Arial, sans-serif; font-size: 12px; font-weight: 600; fill: #1f2937; }\n'
+    b'  .bar { rx: 4; }\n'
+    b'  .axis { stroke: #e5e7eb; stroke-width: 1; }\n'
+    b'</style>\n'
+)
+
+_PIE_STYLE = (
+    b'<style>\n'
+    b'  .title { font-family: Inter, Arial, sans-serif; font-size: 18px; font-weight: 600; fill: #1a1a1a; }\n'
+    b'  .legend-label { font-family: Inter, Arial, sans-serif; font-size: 12px; fill: #374151; }\n'
+    b'  .legend-value { font-family: Inter, Arial, sans-serif; font-size: 12px; font-weight: 600; fill: #1f2937; }\n'
+    b'</style>\n'
+)
+
+_STAT_CARDS_STYLE = (
+    b'<style>\n'
+    b'  .title { font-family: Inter, Arial, sans-serif; font-size: 18px; font-weight: 600; fill: #1a1a1a; }\n'
+    b'  .stat-value { font-family: Inter, Arial, sans-serif; font-size: 28px; font-weight: 700; fill: #2563eb; }\n'
+    b'  .stat-label { font-family: Inter, Arial, sans-serif; font-size: 12px; font-weight: 600; fill: #374151; }\n'
+    b'  .stat-desc { font-family: Inter, Arial, sans-serif; font-size: 10px; fill: #6b7280; }\n'
+    b'  .card { fill: #f8fafc; stroke: #e2e8f0; stroke-width: 1; rx: 8; }\n'
+    b'</style>\n'
+)
+
+_TABLE_STYLE = (
+    b'<style>\n'
+    b'  .header { font-family: Arial, sans-serif; font-size: 14px; font-weight: bold; fill: #2c3e50; }\n'
+    b'  .cell { font-family: Arial, sans-serif; font-size: 12px; fill: #34495e; }\n'
+    b'  .title { font-family: Arial, sans-serif; font-size: 16px; font-weight: bold; fill: #2c3e50; }\n'
+    b'</style>\n'
+)
+
+_FLOWCHART_STYLE = (
+    b'<style>\n'
+    b'  .box { fill: #3498db; stroke: #2980b9; stroke-width: 2; rx: 8; }\n'
+    b'  .text { font-family: Arial, sans-serif; font-size: 12px; fill: white; text-anchor: middle; }\n'
+    b'  .arrow { stroke: #7f8c8d; stroke-width: 2; fill: none; marker-end: url(#arrowhead); }\n'
+    b'  .title { font-family: Arial, sans-serif; font-size: 14px; font-weight: bold; fill: #2c3e50; }\n'
+    b'</style>\n'
+    b'<defs>\n'
+    b'  <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="9" refY="3.5" orient="auto">\n'
+    b'    <polygon points="0 0, 10 3.5, 0 7" fill="#7f8c8d"/>\n'
+    b'  </marker>\n'
+    b'</defs>\n'
+)
+
+_PIE_COLORS = (b'#2563eb', b'#10b981', b'#f59e0b', b'#ef4444', b'#8b5cf6', b'#06b6d4', b'#ec4899', b'#84cc16')
+
+# Pre-rendered bytes for the small integer coordinates that dominate chart output
+_COORD_BYTES = [b'%d' % i for i in range(200)]
+
+
+def _coord(v: float) -> bytes:
+    """Format an SVG coordinate rounded to at most one decimal place."""
+    v = round(v, 1)
+    i = int(v)
+    if i == v:
+        return _COORD_BYTES[i] if 0 <= i < 200 else b'%d' % i
+    return b'%.1f' % v
+
+
+def _text(value) -> bytes:
+    """Escape a user-supplied value for an SVG text node and encode it as UTF-8."""
+    return escape(str(value)).encode('utf-8')
+
+
+# Output directories already created during this process
+_ENSURED_DIRS: set[Path] = set()
+
+
+def _ensure_dir(path: Path) -> None:
+    """Create a directory (and parents) once per process."""
+    if path not in _ENSURED_DIRS:
+        path.mkdir(parents=True, exist_ok=True)
+        _ENSURED_DIRS.add(path)
+
+
 def create_bar_chart_svg(data: list[dict], title: str, output_path: Path,
                          bar_color: str = "#2563eb", show_values: bool = True) -> dict:
     """
@@ -31,56 +153,52 @@ def create_bar_chart_svg(data: list[dict], title: str, output_path: Path,
     width = padding * 2 + label_width + chart_width + 60
     height = padding * 2 + len(data) * (bar_height + bar_gap) + 40
 
+    title_text = _text(title)
     max_value = max(item.get('value', 0) for item in data)
     if max_value == 0:
         max_value = 100
 
-    svg_parts = [
-        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
-        '<style>',
-        '  .title { font-family: Inter, Arial, sans-serif; font-size: 18px; font-weight: 600; fill: #1a1a1a; }',
-        '  .label { font-family: Inter, Arial, sans-serif; font-size: 13px; fill: #374151; }',
-        '  .value { font-family: Inter, Arial, sans-serif; font-size: 12px; font-weight: 600; fill: #1f2937; }',
-        '  .bar { rx: 4; }',
-        '  .axis { stroke: #e5e7eb; stroke-width: 1; }',
-        '</style>',
-        f'<rect width="{width}" height="{height}" fill="#ffffff"/>',
-        f'<text x="{width/2}" y="{padding - 10}" text-anchor="middle" class="title">{title}</text>',
-    ]
+    buf = bytearray()
+    buf.extend(_SVG_OPEN_TMPL % (width, height, width, height))
+    buf.extend(_BAR_STYLE)
+    buf.extend(_BACKGROUND_TMPL % (width, height, b'#ffffff'))
+    buf.extend(_TITLE_TMPL % (_coord(width/2), padding - 10, title_text))
 
     # Draw bars
     y_start = padding + 20
+    x_bar = padding + label_width
+    label_x = x_bar - 10
+    text_offset = bar_height/2 + 5
+
+    # Truncate long labels, then escape them for SVG text in one pass
+    labels = [str(item.get('label', f'Item {i+1}')) for i, item in enumerate(data)]
+    display_labels = [_text(label[:28] + '...' if len(label) > 28 else label) for label in labels]
+    bar_fill = bar_color.encode('utf-8')
+
     for i, item in enumerate(data):
         y = y_start + i * (bar_height + bar_gap)
         value = item.get('value', 0)
-        label = item.get('label', f'Item {i+1}')
-
-        # Truncate label if too long
-        display_label = label[:28] + '...' if len(label) > 28 else label
 
         bar_width = (value / max_value) * chart_width
-        x_bar = padding + label_width
-
-        # Label
-        svg_parts.append(f'<text x="{padding + label_width - 10}" y="{y + bar_height/2 + 5}" text-anchor="end" class="label">{display_label}</text>')
+        text_y = _coord(y + text_offset)
 
-        # Bar background
-        svg_parts.append(f'<rect x="{x_bar}" y="{y}" width="{chart_width}" height="{bar_height}" fill="#f3f4f6" class="bar"/>')
+        # Label and bar background
+        buf.extend(_BAR_ROW_TMPL % (label_x, text_y, display_labels[i],
+                                    x_bar, y, chart_width, bar_height))
 
         # Bar
         if bar_width > 0:
-            svg_parts.append(f'<rect x="{x_bar}" y="{y}" width="{bar_width}" height="{bar_height}" fill="{bar_color}" class="bar"/>')
+            buf.extend(_BAR_FILL_TMPL % (x_bar, y, _coord(bar_width), bar_height, bar_fill))
 
         # Value
         if show_values:
-            unit = item.get('unit', '%')
-            value_text = f"{value}{unit}"
-            svg_parts.append(f'<text x="{x_bar + bar_width + 8}" y="{y + bar_height/2 + 5}" class="value">{value_text}</text>')
+            buf.extend(_BAR_VALUE_TMPL % (_coord(x_bar + bar_width + 8), text_y, _text(value),
+                                          _text(item.get('unit', '%'))))
 
-    svg_parts.append('</svg>')
+    buf.extend(b'</svg>\n')
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text('\n'.join(svg_parts))
+    _ensure_dir(output_path.parent)
+    output_path.write_bytes(buf)
 
     return {
         'path': str(output_path),
@@ -104,77 +222,57 @@ def create_pie_chart_svg(data: list[dict], title: str, output_path: Path) -> dic
     cx, cy = 180, 175
     radius = 120
 
+    title_text = _text(title)
     total = sum(item.get('value', 0) for item in data)
     if total == 0:
         total = 1
 
-    colors = ['#2563eb', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#06b6d4', '#ec4899', '#84cc16']
-
-    svg_parts = [
-        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
-        '<style>',
-        '  .title { font-family: Inter, Arial, sans-serif; font-size: 18px; font-weight: 600; fill: #1a1a1a; }',
-        '  .legend-label { font-family: Inter, Arial, sans-serif; font-size: 12px; fill: #374151; }',
-        '  .legend-value { font-family: Inter, Arial, sans-serif; font-size: 12px; font-weight: 600; fill: #1f2937; }',
-        '</style>',
-        f'<rect width="{width}" height="{height}" fill="#ffffff"/>',
-        f'<text x="{width/2}" y="30" text-anchor="middle" class="title">{title}</text>',
-    ]
+    buf = bytearray()
+    buf.extend(_SVG_OPEN_TMPL % (width, height, width, height))
+    buf.extend(_PIE_STYLE)
+    buf.extend(_BACKGROUND_TMPL % (width, height, b'#ffffff'))
+    buf.extend(_TITLE_TMPL % (_coord(width/2), 30, title_text))
+
+    # Slice boundary points: the end of each slice is the start of the next,
+    # so every point is computed once
+    sweeps = [(item.get('value', 0) / total) * 360 for item in data]
+    angles = [-90]  # Start from top
+    for angle in sweeps:
+        angles.append(angles[-1] + angle)
+    points = [(_coord(cx + radius * math.cos(rad)), _coord(cy + radius * math.sin(rad)))
+              for rad in map(math.radians, angles)]
 
     # Draw pie slices
-    start_angle = -90  # Start from top
-    for i, item in enumerate(data):
-        value = item.get('value', 0)
-        percentage = (value / total) * 100
-        angle = (value / total) * 360
-
-        color = colors[i % len(colors)]
-
-        # Calculate arc
-        end_angle = start_angle + angle
-
-        # Convert to radians
-        start_rad = math.radians(start_angle)
-        end_rad = math.radians(end_angle)
+    for i, angle in enumerate(sweeps):
+        color = _PIE_COLORS[i % len(_PIE_COLORS)]
 
-        # Calculate points
-        x1 = cx + radius * math.cos(start_rad)
-        y1 = cy + radius * math.sin(start_rad)
-        x2 = cx + radius * math.cos(end_rad)
-        y2 = cy + radius * math.sin(end_rad)
-
-        # Large arc flag
-        large_arc = 1 if angle > 180 else 0
-
-        # Draw slice
         if angle < 360:
-            path = f'M {cx},{cy} L {x1},{y1} A {radius},{radius} 0 {large_arc},1 {x2},{y2} Z'
+            x1, y1 = points[i]
+            x2, y2 = points[i + 1]
+            large_arc = 1 if angle > 180 else 0
+            buf.extend(_PIE_SLICE_TMPL % (cx, cy, x1, y1, radius, radius, large_arc, x2, y2, color))
         else:
             # Full circle
-            path = f'M {cx},{cy - radius} A {radius},{radius} 0 1,1 {cx},{cy + radius} A {radius},{radius} 0 1,1 {cx},{cy - radius} Z'
-
-        svg_parts.append(f'<path d="{path}" fill="{color}" stroke="#ffffff" stroke-width="2"/>')
-
-        start_angle = end_angle
+            buf.extend(_PIE_CIRCLE_TMPL % (cx, cy - radius, radius, radius, cx, cy + radius,
+                                           radius, radius, cx, cy - radius, color))
 
     # Legend
     legend_x = 330
     legend_y = 70
     for i, item in enumerate(data):
         y = legend_y + i * 32
-        label = item.get('label', f'Item {i+1}')[:15]
-        value = item.get('value', 0)
-        percentage = (value / total) * 100
-        color = colors[i % len(colors)]
+        label = _text(str(item.get('label', f'Item {i+1}'))[:15])
+        percentage = (item.get('value', 0) / total) * 100
+        color = _PIE_COLORS[i % len(_PIE_COLORS)]
 
-        svg_parts.append(f'<rect x="{legend_x}" y="{y}" width="16" height="16" fill="{color}" rx="2"/>')
-        svg_parts.append(f'<text x="{legend_x + 24}" y="{y + 12}" class="legend-label">{label}</text>')
-        svg_parts.append(f'<text x="{legend_x + 24}" y="{y + 26}" class="legend-value">{percentage:.1f}%</text>')
+        buf.extend(_PIE_LEGEND_TMPL % (legend_x, y, color,
+                                       legend_x + 24, y + 12, label,
+                                       legend_x + 24, y + 26, percentage))
 
-    svg_parts.append('</svg>')
+    buf.extend(b'</svg>\n')
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text('\n'.join(svg_parts))
+    _ensure_dir(output_path.parent)
+    output_path.write_bytes(buf)
 
     return {
         'path': str(output_path),
@@ -201,19 +299,13 @@ def create_stat_cards_svg(data: list[dict], title: str, output_path: Path) -> di
     padding = 30
     width = padding * 2 + cols * card_width + (cols - 1) * gap
     height = padding * 2 + rows * card_height + (rows - 1) * gap + 40
+    title_text = _text(title)
 
-    svg_parts = [
-        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
-        '<style>',
-        '  .title { font-family: Inter, Arial, sans-serif; font-size: 18px; font-weight: 600; fill: #1a1a1a; }',
-        '  .stat-value { font-family: Inter, Arial, sans-serif; font-size: 28px; font-weight: 700; fill: #2563eb; }',
-        '  .stat-label { font-family: Inter, Arial, sans-serif; font-size: 12px; font-weight: 600; fill: #374151; }',
-        '  .stat-desc { font-family: Inter, Arial, sans-serif; font-size: 10px; fill: #6b7280; }',
-        '  .card { fill: #f8fafc; stroke: #e2e8f0; stroke-width: 1; rx: 8; }',
-        '</style>',
-        f'<rect width="{width}" height="{height}" fill="#ffffff"/>',
-        f'<text x="{width/2}" y="{padding}" text-anchor="middle" class="title">{title}</text>',
-    ]
+    buf = bytearray()
+    buf.extend(_SVG_OPEN_TMPL % (width, height, width, height))
+    buf.extend(_STAT_CARDS_STYLE)
+    buf.extend(_BACKGROUND_TMPL % (width, height, b'#ffffff'))
+    buf.extend(_TITLE_TMPL % (_coord(width/2), padding, title_text))
 
     y_start = padding + 30
     for i, item in enumerate(data):
@@ -221,28 +313,25 @@ def create_stat_cards_svg(data: list[dict], title: str, output_path: Path) -> di
         row = i // cols
         x = padding + col * (card_width + gap)
         y = y_start + row * (card_height + gap)
+        center_x = _coord(x + card_width/2)
 
-        value = str(item.get('value', ''))
-        label = item.get('label', '')[:20]
-        desc = item.get('description', '')[:30]
+        value = _text(item.get('value', ''))
+        label = _text(str(item.get('label', ''))[:20])
+        desc = _text(str(item.get('description', ''))[:30])
 
-        # Card background
-        svg_parts.append(f'<rect x="{x}" y="{y}" width="{card_width}" height="{card_height}" class="card"/>')
-
-        # Value
-        svg_parts.append(f'<text x="{x + card_width/2}" y="{y + 40}" text-anchor="middle" class="stat-value">{value}</text>')
-
-        # Label
-        svg_parts.append(f'<text x="{x + card_width/2}" y="{y + 60}" text-anchor="middle" class="stat-label">{label}</text>')
+        # Card background, value and label
+        buf.extend(_STAT_CARD_TMPL % (x, y, card_width, card_height,
+                                      center_x, y + 40, value,
+                                      center_x, y + 60, label))
 
         # Description
         if desc:
-            svg_parts.append(f'<text x="{x + card_width/2}" y="{y + 80}" text-anchor="middle" class="stat-desc">{desc}</text>')
+            buf.extend(_STAT_DESC_TMPL % (center_x, y + 80, desc))
 
-    svg_parts.append('</svg>')
+    buf.extend(b'</svg>\n')
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text('\n'.join(svg_parts))
+    _ensure_dir(output_path.parent)
+    output_path.write_bytes(buf)
 
     return {
         'path': str(output_path),
@@ -263,42 +352,39 @@ def create_comparison_table_svg(items: list[dict], title: str, output_path: Path
     header_height = 50
     padding = 20
     
-    # Get all unique keys from items
-    all_keys = []
-    for item in items:
-        for key in item.keys():
-            if key not in all_keys and key != 'name':
-                all_keys.append(key)
+    # Get all unique keys from items (dict.fromkeys keeps first-seen order)
+    all_keys = list(dict.fromkeys(key for item in items for key in item if key != 'name'))
     
     width = padding * 2 + col_width * (num_items + 1)
     height = padding * 2 + header_height + row_height * (len(all_keys) + 1)
+    title_text = _text(title)
 
     # Build SVG
-    svg_parts = [
-        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
-        '<style>',
-        '  .header { font-family: Arial, sans-serif; font-size: 14px; font-weight: bold; fill: #2c3e50; }',
-        '  .cell { font-family: Arial, sans-serif; font-size: 12px; fill: #34495e; }',
-        '  .title { font-family: Arial, sans-serif; font-size: 16px; font-weight: bold; fill: #2c3e50; }',
-        '</style>',
-        f'<rect width="{width}" height="{height}" fill="#fff"/>',
-    ]
+    buf = bytearray()
+    buf.extend(_SVG_OPEN_TMPL % (width, height, width, height))
+    buf.extend(_TABLE_STYLE)
+    buf.extend(_BACKGROUND_TMPL % (width, height, b'#fff'))
 
     # Title
-    svg_parts.append(f'<text x="{width/2}" y="25" text-anchor="middle" class="title">{title}</text>')
+    buf.extend(_TITLE_TMPL % (_coord(width/2), 25, title_text))
 
     y_start = padding + header_height
     x_start = padding
 
+    row_width = width - padding*2
+
+    # Column x positions and row labels depend only on the column/row, not the cell
+    col_x = [x_start + col_width * (i + 1) + 10 for i in range(num_items)]
+    row_labels = [_text(key.replace("_", " ").title()) for key in all_keys]
+
     # Header row background
-    svg_parts.append(f'<rect x="{x_start}" y="{y_start - row_height}" width="{width - padding*2}" height="{row_height}" fill="#3498db" opacity="0.2"/>')
+    buf.extend(_TABLE_HEADER_BG_TMPL % (x_start, y_start - row_height, row_width, row_height))
 
     # Column headers (item names)
-    svg_parts.append(f'<text x="{x_start + 10}" y="{y_start - 12}" class="header">Feature</text>')
+    buf.extend(_TABLE_HEADER_TMPL % (x_start + 10, y_start - 12, b'Feature'))
     for i, item in enumerate(items):
-        x = x_start + col_width * (i + 1) + 10
-        name = item.get('name', f'Item {i+1}')
-        svg_parts.append(f'<text x="{x}" y="{y_start - 12}" class="header">{name}</text>')
+        name = _text(item.get('name', f'Item {i+1}'))
+        buf.extend(_TABLE_HEADER_TMPL % (col_x[i], y_start - 12, name))
 
     # Data rows
     for row_idx, key in enumerate(all_keys):
@@ -306,24 +392,24 @@ def create_comparison_table_svg(items: list[dict], title: str, output_path: Path
         
         # Alternating row background
         if row_idx % 2 == 0:
-            svg_parts.append(f'<rect x="{x_start}" y="{y}" width="{width - padding*2}" height="{row_height}" fill="#ecf0f1"/>')
+            buf.extend(_TABLE_ROW_BG_TMPL % (x_start, y, row_width, row_height))
         
         # Row label
-        svg_parts.append(f'<text x="{x_start + 10}" y="{y + 25}" class="cell">{key.replace("_", " ").title()}</text>')
+        text_y = y + 25
+        buf.extend(_TABLE_CELL_TMPL % (x_start + 10, text_y, row_labels[row_idx]))
         
         # Cell values
         for i, item in enumerate(items):
-            x = x_start + col_width * (i + 1) + 10
-            value = str(item.get(key, '-'))[:20]
-            svg_parts.append(f'<text x="{x}" y="{y + 25}" class="cell">{value}</text>')
+            value = _text(str(item.get(key, '-'))[:20])
+            buf.extend(_TABLE_CELL_TMPL % (col_x[i], text_y, value))
 
     # Grid lines
-    svg_parts.append(f'<rect x="{x_start}" y="{y_start - row_height}" width="{width - padding*2}" height="{row_height * (len(all_keys) + 1)}" fill="none" stroke="#bdc3c7"/>')
+    buf.extend(_TABLE_GRID_TMPL % (x_start, y_start - row_height, row_width, row_height * (len(all_keys) + 1)))
 
-    svg_parts.append('</svg>')
+    buf.extend(b'</svg>\n')
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text('\n'.join(svg_parts))
+    _ensure_dir(output_path.parent)
+    output_path.write_bytes(buf)
 
     return {
         'path': str(output_path),
@@ -342,42 +428,31 @@ def create_flowchart_svg(steps: list[str], title: str, output_path: Path) -> dic
     width = box_width + padding * 2
     height = len(steps) * (box_height + gap) + padding * 2
 
-    svg_parts = [
-        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
-        '<style>',
-        '  .box { fill: #3498db; stroke: #2980b9; stroke-width: 2; rx: 8; }',
-        '  .text { font-family: Arial, sans-serif; font-size: 12px; fill: white; text-anchor: middle; }',
-        '  .arrow { stroke: #7f8c8d; stroke-width: 2; fill: none; marker-end: url(#arrowhead); }',
-        '  .title { font-family: Arial, sans-serif; font-size: 14px; font-weight: bold; fill: #2c3e50; }',
-        '</style>',
-        '<defs>',
-        '  <marker id="arrowhead" markerWidth="10" markerHeight="7" refX="9" refY="3.5" orient="auto">',
-        '    <polygon points="0 0, 10 3.5, 0 7" fill="#7f8c8d"/>',
-        '  </marker>',
-        '</defs>',
-        f'<rect width="{width}" height="{height}" fill="#fff"/>',
-    ]
+    buf = bytearray()
+    buf.extend(_SVG_OPEN_TMPL % (width, height, width, height))
+    buf.extend(_FLOWCHART_STYLE)
+    buf.extend(_BACKGROUND_TMPL % (width, height, b'#fff'))
 
     x = padding
+    center_x = _coord(x + box_width/2)
+    text_offset = box_height/2 + 5
     for i, step in enumerate(steps):
         y = padding + i * (box_height + gap)
         
-        # Box
-        svg_parts.append(f'<rect x="{x}" y="{y}" width="{box_width}" height="{box_height}" class="box"/>')
-        
-        # Text (truncate if too long)
-        text = step[:25] + ('...' if len(step) > 25 else '')
-        svg_parts.append(f'<text x="{x + box_width/2}" y="{y + box_height/2 + 5}" class="text">{text}</text>')
+        # Box and text (truncate if too long)
+        text = _text(step[:25] + ('...' if len(step) > 25 else ''))
+        buf.extend(_FLOW_BOX_TMPL % (x, y, box_width, box_height,
+                                     center_x, _coord(y + text_offset), text))
         
         # Arrow to next box
         if i < len(steps) - 1:
             arrow_y = y + box_height
-            svg_parts.append(f'<line x1="{x + box_width/2}" y1="{arrow_y}" x2="{x + box_width/2}" y2="{arrow_y + gap - 5}" class="arrow"/>')
+            buf.extend(_FLOW_ARROW_TMPL % (center_x, arrow_y, center_x, arrow_y + gap - 5))
 
-    svg_parts.append('</svg>')
+    buf.extend(b'</svg>\n')
 
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text('\n'.join(svg_parts))
+    _ensure_dir(output_path.parent)
+    output_path.write_bytes(buf)
 
     return {
         'path': str(output_path),
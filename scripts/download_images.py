@@ -8,63 +8,141 @@ Download and optimize images from URLs for research reports.
 """
 
 import argparse
+import functools
 import hashlib
 import json
+import os
+import shutil
+import struct
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from io import BytesIO
 
 import requests
+from requests.adapters import HTTPAdapter
 from PIL import Image
 
+# Images smaller than this are treated as icons/logos and skipped
+MIN_WIDTH = 200
+MIN_HEIGHT = 100
 
+# JPEGs already within max_width and this size are copied instead of re-encoded
+PASSTHROUGH_MAX_BYTES = 200 * 1024
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+@functools.lru_cache(maxsize=4096)
 def sanitize_filename(url: str) -> str:
-    """Create a safe filename from URL hash."""
-    url_hash = hashlib.md5(url.encode()).hexdigest()[:12]
-    return url_hash
+    """Create a safe filename from URL hash (12 hex chars)."""
+    return hashlib.blake2b(url.encode('utf-8', 'ignore'), digest_size=6).hexdigest()
+
+
+def create_session(max_workers: int = 16) -> requests.Session:
+    """Create an HTTP session whose connection pool can serve max_workers threads."""
+    session = requests.Session()
+    session.headers['User-Agent'] = USER_AGENT
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers * 2)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
 
 
-def download_image(url: str, output_dir: Path, timeout: int = 30) -> dict | None:
+def download_image(url: str, output_dir: Path, timeout: int = 30,
+                   session: requests.Session | None = None) -> dict | None:
     """Download an image from URL."""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=timeout, stream=True)
-        response.raise_for_status()
-
-        content_type = response.headers.get('content-type', '')
-        if 'image' not in content_type.lower():
-            return None
+        headers = {'User-Agent': USER_AGENT}
+        with (session or requests).get(url, headers=headers, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
 
-        filename = sanitize_filename(url)
-
-        # Determine extension from content type
-        if 'png' in content_type:
-            ext = '.png'
-        elif 'gif' in content_type:
-            ext = '.gif'
-        elif 'webp' in content_type:
-            ext = '.webp'
-        elif 'svg' in content_type:
-            ext = '.svg'
-        else:
-            ext = '.jpg'
+            content_type = response.headers.get('content-type', '')
+            if 'image' not in content_type.lower():
+                return None
+
+            filename = sanitize_filename(url)
+
+            # Determine extension from content type
+            if 'png' in content_type:
+                ext = '.png'
+            elif 'gif' in content_type:
+                ext = '.gif'
+            elif 'webp' in content_type:
+                ext = '.webp'
+            elif 'svg' in content_type:
+                ext = '.svg'
+            else:
+                ext = '.jpg'
 
-        output_path = output_dir / f"{filename}{ext}"
-        output_path.write_bytes(response.content)
+            output_path = output_dir / f"{filename}{ext}"
+
+            # Stream the body to disk instead of holding the whole image in memory,
+            # hashing it on the way so duplicate content can be found without rereading
+            size = 0
+            digest = hashlib.md5()
+            try:
+                with open(output_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+            except Exception:
+                output_path.unlink(missing_ok=True)  # Don't leave a truncated file in the pool
+                raise
 
-        return {
-            'path': str(output_path),
-            'url': url,
-            'size': len(response.content),
-            'format': ext
-        }
+            return {
+                'path': str(output_path),
+                'url': url,
+                'size': size,
+                'format': ext,
+                'digest': digest.hexdigest()
+            }
     except Exception as e:
         print(f"Failed to download {url}: {e}", file=sys.stderr)
         return None
 
 
+def read_image_size(path: Path) -> tuple[int, int] | None:
+    """
+    Read (width, height) from a PNG or JPEG header without decoding the image.
+    Returns None for other formats or unparseable headers.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(24)
+        # PNG: 8-byte signature, then the IHDR chunk carrying width/height
+        if head[:8] == b'\x89PNG\r\n\x1a\n' and head[12:16] == b'IHDR':
+            return struct.unpack('>II', head[16:24])
+        if head[:2] != b'\xff\xd8':
+            return None
+
+        # JPEG: walk the marker segments up to the first SOFn frame header
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            code = marker[1]
+            while code == 0xFF:  # Fill bytes before a marker
+                byte = f.read(1)
+                if not byte:
+                    return None
+                code = byte[0]
+            if code == 0x01 or 0xD0 <= code <= 0xD7:  # Standalone markers carry no length
+                continue
+            length_bytes = f.read(2)
+            if len(length_bytes) < 2:
+                return None
+            length = struct.unpack('>H', length_bytes)[0]
+            if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+                frame = f.read(5)
+                if len(frame) < 5:
+                    return None
+                height, width = struct.unpack('>xHH', frame)
+                return width, height
+            f.seek(length - 2, 1)
+
+
 def optimize_image(input_path: Path, output_dir: Path, max_width: int = 800, quality: int = 85) -> dict | None:
     """
     Optimize an image:
@@ -73,22 +151,50 @@ def optimize_image(input_path: Path, output_dir: Path, max_width: int = 800, qua
     - Compress to specified quality
     """
     try:
-        with Image.open(input_path) as img:
-            original_size = input_path.stat().st_size
-            original_format = img.format
+        # Reject icons/logos from the file header alone, before Pillow is involved
+        header_size = read_image_size(input_path)
+        if header_size and (header_size[0] < MIN_WIDTH or header_size[1] < MIN_HEIGHT):
+            return None
 
-            # Get dimensions
+        with Image.open(input_path) as img:
+            # Get dimensions (header only; pixels are not decoded yet)
             width, height = img.size
 
             # Skip very small images (likely icons/logos)
-            if width < 200 or height < 100:
+            if width < MIN_WIDTH or height < MIN_HEIGHT:
                 return None
 
+            original_size = input_path.stat().st_size
+            original_format = img.format
+
+            # Already within budget: skip the decode/resize/encode round-trip
+            if original_format == 'JPEG' and width <= max_width and original_size <= PASSTHROUGH_MAX_BYTES:
+                output_path = output_dir / (input_path.stem + '_optimized.jpg')
+                shutil.copyfile(input_path, output_path)
+                return {
+                    'path': str(output_path),
+                    'original_path': str(input_path),
+                    'original_size': original_size,
+                    'new_size': original_size,
+                    'width': width,
+                    'height': height,
+                    'format': '.jpg',
+                    'compression_ratio': 1.0
+                }
+
+            # Let libjpeg decode large JPEGs at a reduced scale (1/2, 1/4, 1/8),
+            # keeping at least 2x the target size for the final LANCZOS pass
+            if original_format == 'JPEG' and width > max_width:
+                img.draft('RGB', (max_width * 2, height * max_width * 2 // width))
+                width, height = img.size
+
             # Calculate new size if needed
             if width > max_width:
                 ratio = max_width / width
                 new_height = int(height * ratio)
-                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
+                # For large downscales, reduce by an integer factor (int(ratio / 2)) with a
+                # cheap box filter first; LANCZOS then covers the remaining 2x-4x
+                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS, reducing_gap=2.0)
 
             # Determine output format
             has_transparency = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
@@ -110,7 +216,8 @@ def optimize_image(input_path: Path, output_dir: Path, max_width: int = 800, qua
 
             # Save with optimization
             if output_format == 'JPEG':
-                img.save(output_path, format=output_format, quality=quality, optimize=True)
+                img.save(output_path, format=output_format, quality=quality, optimize=True,
+                         progressive=True, subsampling=2)
             else:
                 img.save(output_path, format=output_format, optimize=True)
 
@@ -131,7 +238,13 @@ def optimize_image(input_path: Path, output_dir: Path, max_width: int = 800, qua
         return None
 
 
-def process_images(urls: list[str], pool_dir: Path, output_dir: Path, max_width: int = 800, quality: int = 85) -> dict:
+def _optimize_worker(args: tuple) -> dict | None:
+    """Process pool entry point: unpack arguments for optimize_image."""
+    return optimize_image(*args)
+
+
+def process_images(urls: list[str], pool_dir: Path, output_dir: Path, max_width: int = 800, quality: int = 85,
+                   max_workers: int = 16) -> dict:
     """Download and optimize multiple images."""
     pool_dir.mkdir(parents=True, exist_ok=True)
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -140,20 +253,41 @@ def process_images(urls: list[str], pool_dir: Path, output_dir: Path, max_width:
     optimized = []
     failed = []
 
-    # Download all images
-    for url in urls:
-        result = download_image(url, pool_dir)
-        if result:
-            downloaded.append(result)
+    # Download each distinct URL once, concurrently (network-bound), sharing one connection pool;
+    # repeated URLs would otherwise race on the same pool file
+    unique_urls = list(dict.fromkeys(urls))
+    with create_session(max_workers) as session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = dict(zip(unique_urls, executor.map(
+            lambda url: download_image(url, pool_dir, session=session), unique_urls)))
+        for url in urls:
+            result = results[url]
+            if result:
+                downloaded.append(result)
+            else:
+                failed.append({'url': url, 'reason': 'download_failed'})
+
+    # Identical files downloaded from different URLs are optimized only once
+    unique_rasters = {}  # content digest -> first download path with that content
+    for img_info in downloaded:
+        if img_info['format'] != '.svg':
+            unique_rasters.setdefault(img_info['digest'], Path(img_info['path']))
+
+    # Optimize raster images in worker processes (CPU-bound); SVGs are just copied below
+    raster_results = {}
+    if unique_rasters:
+        jobs = [(input_path, output_dir, max_width, quality) for input_path in unique_rasters.values()]
+        if len(jobs) == 1:
+            # Not worth starting a process pool for a single image
+            raster_results = dict(zip(unique_rasters, map(_optimize_worker, jobs)))
         else:
-            failed.append({'url': url, 'reason': 'download_failed'})
+            max_workers = min(os.cpu_count() or 1, len(jobs))
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                raster_results = dict(zip(unique_rasters, executor.map(_optimize_worker, jobs, chunksize=4)))
 
-    # Optimize downloaded images
     for img_info in downloaded:
         input_path = Path(img_info['path'])
         if input_path.suffix.lower() == '.svg':
             # SVGs don't need optimization, just copy
-            import shutil
             output_path = output_dir / input_path.name
             shutil.copy(input_path, output_path)
             optimized.append({
@@ -162,10 +296,9 @@ def process_images(urls: list[str], pool_dir: Path, output_dir: Path, max_width:
                 'format': '.svg'
             })
         else:
-            result = optimize_image(input_path, output_dir, max_width, quality)
+            result = raster_results[img_info['digest']]
             if result:
-                result['url'] = img_info['url']
-                optimized.append(result)
+                optimized.append({**result, 'url': img_info['url']})
             else:
                 failed.append({'url': img_info['url'], 'reason': 'optimization_failed'})
 
@@ -186,6 +319,7 @@ def main():
     parser.add_argument('--output-dir', '-o', default='./images/optimized', help='Directory for optimized images')
     parser.add_argument('--max-width', '-w', type=int, default=800, help='Max width in pixels')
     parser.add_argument('--quality', '-q', type=int, default=85, help='JPEG quality (0-100)')
+    parser.add_argument('--workers', type=int, default=16, help='Number of parallel downloads')
     parser.add_argument('--json', action='store_true', help='Output as JSON')
 
     args = parser.parse_args()
@@ -212,7 +346,8 @@ def main():
         Path(args.pool_dir),
         Path(args.output_dir),
         args.max_width,
-        args.quality
+        args.quality,
+        args.workers
     )
 
     if args.json:
@@ -8,12 +8,25 @@ import argparse
 import json
 import re
 import sys
+from html import escape
 from pathlib import Path
 
+_UNSAFE_FILENAME_RE = re.compile(r'[^\w\-]')
+
+_PLACEHOLDER_COLORS = ('#3498db', '#e74c3c', '#2ecc71', '#f39c12', '#9b59b6')
+
+# Placeholder SVG: fill color, stroke color, text color, topic, image number
+_PLACEHOLDER_TMPL = '''<svg xmlns="http://www.w3.org/2000/svg" width="400" height="300" viewBox="0 0 400 300">
+  <rect width="400" height="300" fill="%s" opacity="0.2"/>
+  <rect x="10" y="10" width="380" height="280" fill="none" stroke="%s" stroke-width="2"/>
+  <text x="200" y="140" font-family="Arial, sans-serif" font-size="16" fill="%s" text-anchor="middle">%s</text>
+  <text x="200" y="170" font-family="Arial, sans-serif" font-size="14" fill="#666" text-anchor="middle">Image %d</text>
+</svg>'''
+
 
 def sanitize_filename(name: str) -> str:
     """Convert a string to a safe filename."""
-    return re.sub(r'[^\w\-]', '_', name)[:50]
+    return _UNSAFE_FILENAME_RE.sub('_', name)[:50]
 
 
 def fetch_placeholder_images(topic: str, output_dir: Path, count: int = 3) -> list[dict]:
@@ -24,25 +37,16 @@ def fetch_placeholder_images(topic: str, output_dir: Path, count: int = 3) -> li
     images = []
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    colors = ['#3498db', '#e74c3c', '#2ecc71', '#f39c12', '#9b59b6']
+    # Topic-derived strings are the same for every image
+    file_stem = sanitize_filename(topic)
+    topic_text = escape(topic)
 
     for i in range(count):
-        color = colors[i % len(colors)]
-        filename = f"{sanitize_filename(topic)}_{i+1}.svg"
+        color = _PLACEHOLDER_COLORS[i % len(_PLACEHOLDER_COLORS)]
+        filename = f"{file_stem}_{i+1}.svg"
         filepath = output_dir / filename
 
-        svg_content = f'''<svg xmlns="http://www.w3.org/2000/svg" width="400" height="300" viewBox="0 0 400 300">
-  <rect width="400" height="300" fill="{color}" opacity="0.2"/>
-  <rect x="10" y="10" width="380" height="280" fill="none" stroke="{color}" stroke-width="2"/>
-  <text x="200" y="140" font-family="Arial, sans-serif" font-size="16" fill="{color}" text-anchor="middle">
-    {topic}
-  </text>
-  <text x="200" y="170" font-family="Arial, sans-serif" font-size="14" fill="#666" text-anchor="middle">
-    Image {i+1}
-  </text>
-</svg>'''
-
-        filepath.write_text(svg_content)
+        filepath.write_text(_PLACEHOLDER_TMPL % (color, color, color, topic_text, i + 1))
         images.append({
             'path': str(filepath),
             'caption': f'{topic} - Figure {i+1}',
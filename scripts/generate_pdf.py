@@ -5,50 +5,175 @@ Uses weasyprint for HTML to PDF conversion.
 """
 
 import argparse
-import base64
+import functools
 import json
+import mmap
+import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
+from urllib.parse import unquote
 
 try:
+    import weasyprint
     from weasyprint import HTML, CSS
     WEASYPRINT_AVAILABLE = True
 except ImportError:
     WEASYPRINT_AVAILABLE = False
 
+# Oldest weasyprint accepting the _PDF_OPTIONS below; an older install is an error,
+# not a reason to fall back to HTML
+WEASYPRINT_MIN_VERSION = 59
+WEASYPRINT_TOO_OLD = False
+if WEASYPRINT_AVAILABLE:
+    WEASYPRINT_TOO_OLD = int(weasyprint.__version__.split('.')[0]) < WEASYPRINT_MIN_VERSION
+    try:
+        from weasyprint.text.fonts import FontConfiguration
+    except ImportError:
+        FontConfiguration = None  # Moved here in weasyprint 53; older versions are rejected anyway
+
+# SIMD base64 encoder (picks the best available ISA at runtime); stdlib fallback
+try:
+    from pybase64 import b64encode
+except ImportError:
+    from base64 import b64encode
+
+# C-accelerated HTML escaping when markupsafe is installed; stdlib fallback
+try:
+    from markupsafe import escape
+except ImportError:
+    from html import escape
+
+try:
+    from markdown_it import MarkdownIt
+    from markdown_it.token import Token
+    MARKDOWN_IT_AVAILABLE = True
+except ImportError:
+    MARKDOWN_IT_AVAILABLE = False
+
+# Linear-time (DFA) engine for the image/column patterns that scan the whole
+# document; falls back to the backtracking stdlib engine if google-re2 is missing.
+# These patterns use inline flags so they compile identically on both engines.
+try:
+    import re2 as _re_linear
+except ImportError:
+    _re_linear = re
+
+# weasyprint write_pdf options: recompress raster images, cap their
+# resolution for print, and keep the PDF streams compressed
+_PDF_OPTIONS = {
+    'optimize_images': True,
+    'jpeg_quality': 85,
+    'dpi': 150,
+    'presentational_hints': False,
+    'uncompressed_pdf': False,
+}
+
+# Regular expressions, compiled once at import
+_RE_TOC_HEADER = re.compile(r'^(#{2,3})[^\S\n]+(.+)$', re.MULTILINE)
+_RE_ANCHOR_TAG = re.compile(r'\s*\{#[^}]+\}')
+_RE_ANCHOR_ID = re.compile(r'\{#([^}]+)\}')
+_RE_ANCHOR_SUFFIX = re.compile(r'\s*\{#([^}]+)\}\s*$')
+# Anchor slugs keep word characters, whitespace, kana, kanji and '-'. One precompiled
+# class-based sub runs entirely in C; a str.translate table was measured slower here
+# (a dict lookup per code point, and CJK rules out the ASCII fast path).
+_RE_ANCHOR_UNSAFE = re.compile(r'[^\w\s\u3040-\u309f\u30a0-\u30ff\u4e00-\u9fff-]')
+_RE_WHITESPACE = re.compile(r'\s+')
+_RE_IMG = _re_linear.compile(r'!\[([^\]]*)\]\(([^)]+)\)')
+_RE_COLUMNS = _re_linear.compile(r'(?s)<!--\s*columns\s*-->(.*?)<!--\s*/columns\s*-->')
+_RE_INLINE_COLS = _re_linear.compile(r'(?m)^.*!\[[^\]]*\]\([^)]+\).*!\[[^\]]*\]\([^)]+\).*$')
+_RE_HEADER_WITH_ANCHOR = re.compile(r'^(#{1,6})\s+(.+\{#[^}]+\})$', re.MULTILINE)
+_RE_H3 = re.compile(r'^### (.+)$', re.MULTILINE)
+_RE_H2 = re.compile(r'^## (.+)$', re.MULTILINE)
+_RE_H1 = re.compile(r'^# (.+)$', re.MULTILINE)
+_RE_BOLD_ITALIC = re.compile(r'\*\*\*(.+?)\*\*\*')
+_RE_BOLD = re.compile(r'\*\*(.+?)\*\*')
+_RE_ITALIC = re.compile(r'(?<!\*)\*([^*\n]+?)\*(?!\*)')
+_RE_LINK = re.compile(r'\[([^\]]+)\]\(([^)]+)\)')
+_RE_HR = re.compile(r'^---+$', re.MULTILINE)
+_RE_OL_ITEM = re.compile(r'^\d+\.\s')
+_RE_TABLE_SEP = re.compile(r'^\|[\s\-:|]+\|$')
+_RE_BLOCK_TAG = re.compile(r'^<(h[1-6]|ul|ol|li|blockquote|figure|hr|p|div|table)', re.IGNORECASE)
+
+
+_IMAGE_MIME_TYPES = {
+    '.svg': 'image/svg+xml',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+}
+
 
 def image_to_data_uri(img_path: Path) -> str:
-    """Convert image file to data URI for embedding."""
-    suffix = img_path.suffix.lower()
-    if suffix == '.svg':
-        content = img_path.read_bytes()
-        encoded = base64.b64encode(content).decode()
-        return f"data:image/svg+xml;base64,{encoded}"
-    elif suffix in ['.jpg', '.jpeg']:
-        content = img_path.read_bytes()
-        encoded = base64.b64encode(content).decode()
-        return f"data:image/jpeg;base64,{encoded}"
-    elif suffix == '.png':
-        content = img_path.read_bytes()
-        encoded = base64.b64encode(content).decode()
-        return f"data:image/png;base64,{encoded}"
-    elif suffix == '.gif':
-        content = img_path.read_bytes()
-        encoded = base64.b64encode(content).decode()
-        return f"data:image/gif;base64,{encoded}"
-    elif suffix == '.webp':
-        content = img_path.read_bytes()
-        encoded = base64.b64encode(content).decode()
-        return f"data:image/webp;base64,{encoded}"
-    else:
+    """Convert image file to data URI for embedding ('' if unsupported or missing)."""
+    mime = _IMAGE_MIME_TYPES.get(img_path.suffix.lower())
+    if not mime:
+        return ""
+
+    try:
+        stat = img_path.stat()
+    except OSError:
         return ""
+    # Keyed on the file version, so an image reused across sections or reports is encoded once
+    return _encode_data_uri(str(img_path.resolve()), mime, stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=512)
+def _encode_data_uri(path: str, mime: str, mtime_ns: int, size: int) -> str:
+    """Base64-encode a file as a data URI (mtime_ns and size only serve as cache key)."""
+    if size == 0:
+        return f"data:{mime};base64,"  # mmap cannot map an empty file
+
+    # Encode straight from the mapped file instead of copying it into a bytes object first
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        encoded = b64encode(m)
+    return f"data:{mime};base64,{encoded.decode('ascii')}"
+
+
+def prefetch_data_uris(img_paths) -> dict[Path, str]:
+    """
+    Read and base64-encode images concurrently.
+    Returns {path: data_uri} with '' for missing files; duplicates are encoded once.
+    """
+    unique_paths = list(dict.fromkeys(img_paths))
+    if not unique_paths:
+        return {}
+    # File reads and base64 encoding both release the GIL, so threads overlap well
+    max_workers = min(32, (os.cpu_count() or 1) * 4, len(unique_paths))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(unique_paths, executor.map(image_to_data_uri, unique_paths)))
 
 
-def svg_to_data_uri(svg_path: Path) -> str:
-    """Convert SVG file to data URI for embedding."""
-    return image_to_data_uri(svg_path)
+def get_data_uri(img_path: Path, data_uris: dict[Path, str] = None) -> str:
+    """Return the data URI for img_path from data_uris, encoding it on a miss ('' if missing)."""
+    if data_uris is not None and img_path in data_uris:
+        return data_uris[img_path]
+    return image_to_data_uri(img_path)
+
+
+def link_image_files(img_paths) -> dict[Path, str]:
+    """
+    Map images to file:// URIs for weasyprint to load from disk, skipping the base64 round trip.
+    Returns {path: uri} with '' for missing files, the same shape as prefetch_data_uris.
+    """
+    return {p: p.resolve().as_uri() if p.is_file() else '' for p in dict.fromkeys(img_paths)}
+
+
+def find_image_paths(markdown: str, base_path: Path = None) -> list[Path]:
+    """Resolve every ![alt](path) reference in markdown, including its percent-decoded form."""
+    paths = []
+    if '![' not in markdown:
+        return paths
+    for _, ref in _RE_IMG.findall(markdown):
+        paths.append(resolve_image_path(ref, base_path))
+        if '%' in ref:
+            # markdown-it decodes %XX in link targets before the image is rendered
+            paths.append(resolve_image_path(unquote(ref), base_path))
+    return paths
 
 
 def generate_toc(markdown: str) -> tuple[str, str]:
@@ -56,50 +181,61 @@ def generate_toc(markdown: str) -> tuple[str, str]:
     Generate a Table of Contents from markdown headers.
     Returns (toc_html, modified_markdown_with_anchors)
     """
-    lines = markdown.split('\n')
+    if '##' not in markdown:
+        return '', markdown
+
     toc_items = []
-    modified_lines = []
+    modified_parts = []
+    cursor = 0
     header_counts = {}  # Track duplicate headers for unique anchors
 
-    for line in lines:
-        # Match headers ## and ### (skip # as it's usually the title)
-        match = re.match(r'^(#{2,3})\s+(.+)$', line)
-        if match:
-            level = len(match.group(1))
-            title = match.group(2).strip()
-
-            # Remove any existing anchor like {#anchor}
-            title_clean = re.sub(r'\s*\{#[^}]+\}', '', title)
-
-            # Create anchor from title
-            anchor = re.sub(r'[^\w\s\u3040-\u309f\u30a0-\u30ff\u4e00-\u9fff-]', '', title_clean.lower())
-            anchor = re.sub(r'\s+', '-', anchor)
-
-            # Handle duplicate anchors
-            if anchor in header_counts:
-                header_counts[anchor] += 1
-                anchor = f"{anchor}-{header_counts[anchor]}"
-            else:
-                header_counts[anchor] = 0
+    # Match headers ## and ### (skip # as it's usually the title) without splitting into lines
+    for match in _RE_TOC_HEADER.finditer(markdown):
+        level = len(match.group(1))
+        title = match.group(2).strip()
+
+        # Remove any existing anchor like {#anchor}
+        title_clean = _RE_ANCHOR_TAG.sub('', title)
 
-            # Add to TOC
-            indent = '  ' * (level - 2)  # ## = 0 indent, ### = 1 indent
-            toc_items.append(f'{indent}- [{title_clean}](#{anchor})')
+        # Create anchor from title
+        anchor = _RE_ANCHOR_UNSAFE.sub('', title_clean.lower())
+        anchor = _RE_WHITESPACE.sub('-', anchor)
 
-            # Add anchor to the line
-            modified_lines.append(f'{match.group(1)} {title_clean} {{#{anchor}}}')
+        # Handle duplicate anchors
+        if anchor in header_counts:
+            header_counts[anchor] += 1
+            anchor = f"{anchor}-{header_counts[anchor]}"
         else:
-            modified_lines.append(line)
+            header_counts[anchor] = 0
+
+        # Add to TOC
+        indent = '  ' * (level - 2)  # ## = 0 indent, ### = 1 indent
+        toc_items.append(f'{indent}- [{title_clean}](#{anchor})')
+
+        # Copy the text up to the header, then the header with its anchor
+        modified_parts.append(markdown[cursor:match.start()])
+        modified_parts.append(f'{match.group(1)} {title_clean} {{#{anchor}}}')
+        cursor = match.end()
 
     if not toc_items:
         return '', markdown
 
     toc_md = "## 目次\n\n" + '\n'.join(toc_items) + "\n\n---\n\n"
-    return toc_md, '\n'.join(modified_lines)
+    modified_parts.append(markdown[cursor:])
+    return toc_md, ''.join(modified_parts)
+
 
+def markdown_to_html(markdown: str, base_path: Path = None, include_toc: bool = True,
+                     data_uris: dict[Path, str] = None, embed_images: bool = False) -> str:
+    """
+    Convert markdown to HTML with full feature support.
+    Images are embedded as data URIs, or linked as file:// URIs when embed_images is False.
+    """
+    if data_uris is None and not embed_images:
+        data_uris = link_image_files(find_image_paths(markdown, base_path))
 
-def markdown_to_html(markdown: str, base_path: Path = None, include_toc: bool = True) -> str:
-    """Convert markdown to HTML with full feature support."""
+    # Prefer the single-pass markdown-it parser; fall back to the regex converter
+    convert = render_markdown if MARKDOWN_IT_AVAILABLE else markdown_to_html_internal
 
     # Generate TOC if requested
     toc_html = ''
@@ -107,249 +243,341 @@ def markdown_to_html(markdown: str, base_path: Path = None, include_toc: bool =
         toc_md, markdown = generate_toc(markdown)
         if toc_md:
             # Convert TOC markdown to HTML separately
-            toc_html = markdown_to_html_internal(toc_md, base_path)
+            toc_html = convert(toc_md, base_path, data_uris)
             toc_html = f'<nav class="toc">{toc_html}</nav>'
 
-    content_html = markdown_to_html_internal(markdown, base_path)
+    content_html = convert(markdown, base_path, data_uris)
 
     return toc_html + content_html
 
 
-def markdown_to_html_internal(markdown: str, base_path: Path = None) -> str:
-    """Internal: Convert markdown to HTML with full feature support."""
-    html = markdown
+def resolve_image_path(img_path_str: str, base_path: Path = None) -> Path:
+    """Resolve an image reference from markdown relative to base_path."""
+    if base_path:
+        return base_path / img_path_str
+    return Path(img_path_str)
+
+
+def render_figure(alt_text: str, img_path_str: str, base_path: Path = None,
+                  data_uris: dict[Path, str] = None) -> str:
+    """Render a single markdown image as an embedded <figure> (or a placeholder if missing)."""
+    img_path = resolve_image_path(img_path_str, base_path)
+    alt_text = escape(alt_text)
+
+    data_uri = get_data_uri(img_path, data_uris)
+    if data_uri:
+        return f'<figure><img src="{data_uri}" alt="{alt_text}" style="max-width:100%; height:auto;"/><figcaption>{alt_text}</figcaption></figure>'
+
+    # Return placeholder if image not found
+    return f'<figure class="missing-image"><div style="background:#f0f0f0; padding:40px; text-align:center; border:1px dashed #ccc;">[Image: {alt_text}]</div></figure>'
+
+
+def render_image_columns(images: list[tuple[str, str]], base_path: Path = None,
+                         data_uris: dict[Path, str] = None) -> str:
+    """Render (alt_text, path) pairs side by side as an image-columns block."""
+    parts = ['<div class="image-columns">']
+    for alt_text, img_path_str in images:
+        img_path = resolve_image_path(img_path_str, base_path)
+
+        data_uri = get_data_uri(img_path, data_uris)
+        if data_uri:
+            alt_text = escape(alt_text)
+            parts.append(f'<figure class="column-item"><img src="{data_uri}" alt="{alt_text}"/><figcaption>{alt_text}</figcaption></figure>')
+    parts.append('</div>')
+    return ''.join(parts)
+
+
+def process_image_columns(markdown: str, base_path: Path = None, data_uris: dict[Path, str] = None,
+                          separate_blocks: bool = False) -> str:
+    """
+    Turn <!-- columns --> sections and lines with 2+ images into image-columns blocks.
+    With separate_blocks, each block is set off by blank lines so a markdown parser ends
+    its raw-HTML block there instead of swallowing the next line (e.g. a caption).
+    """
+    if '![' not in markdown:
+        return markdown  # Both forms need images; skip the whole-document scans
+
+    def wrap(block):
+        return f'\n\n{block}\n\n' if separate_blocks else block
 
     # Process multi-column image sections (<!-- columns --> ... <!-- /columns -->)
     def process_columns(match):
         content = match.group(1)
         # Find all images in the column section
-        images = re.findall(r'!\[([^\]]*)\]\(([^)]+)\)', content)
+        images = _RE_IMG.findall(content)
         if not images:
             return match.group(0)
+        return wrap(render_image_columns(images, base_path, data_uris))
 
-        column_html = '<div class="image-columns">'
-        for alt_text, img_path_str in images:
-            if base_path:
-                img_path = base_path / img_path_str
-            else:
-                img_path = Path(img_path_str)
-
-            if img_path.exists():
-                data_uri = image_to_data_uri(img_path)
-                if data_uri:
-                    column_html += f'<figure class="column-item"><img src="{data_uri}" alt="{alt_text}"/><figcaption>{alt_text}</figcaption></figure>'
-        column_html += '</div>'
-        return column_html
-
-    html = re.sub(r'<!--\s*columns\s*-->(.*?)<!--\s*/columns\s*-->', process_columns, html, flags=re.DOTALL)
+    html = _RE_COLUMNS.sub(process_columns, markdown)
 
     # Process inline multi-image (images on same line become columns)
     def process_inline_columns(match):
         line = match.group(0)
-        images = re.findall(r'!\[([^\]]*)\]\(([^)]+)\)', line)
+        images = _RE_IMG.findall(line)
         if len(images) < 2:
             return line  # Not multi-image, return unchanged
-
-        column_html = '<div class="image-columns">'
-        for alt_text, img_path_str in images:
-            if base_path:
-                img_path = base_path / img_path_str
-            else:
-                img_path = Path(img_path_str)
-
-            if img_path.exists():
-                data_uri = image_to_data_uri(img_path)
-                if data_uri:
-                    column_html += f'<figure class="column-item"><img src="{data_uri}" alt="{alt_text}"/><figcaption>{alt_text}</figcaption></figure>'
-        column_html += '</div>'
-        return column_html
+        return wrap(render_image_columns(images, base_path, data_uris))
 
     # Match lines with 2+ images
-    html = re.sub(r'^.*!\[[^\]]*\]\([^)]+\).*!\[[^\]]*\]\([^)]+\).*$', process_inline_columns, html, flags=re.MULTILINE)
+    return _RE_INLINE_COLS.sub(process_inline_columns, html)
 
-    # Process headers with anchors first (extract anchor, create id)
-    def header_with_anchor(match):
-        hashes = match.group(1)
-        title = match.group(2)
-        anchor_match = re.search(r'\{#([^}]+)\}', title)
-        if anchor_match:
-            anchor = anchor_match.group(1)
-            title_clean = re.sub(r'\s*\{#[^}]+\}', '', title)
-            level = len(hashes)
-            return f'<h{level} id="{anchor}">{title_clean}</h{level}>'
-        return match.group(0)  # Return unchanged if no anchor
 
-    html = re.sub(r'^(#{1,6})\s+(.+\{#[^}]+\})$', header_with_anchor, html, flags=re.MULTILINE)
+def _heading_anchor_rule(state) -> None:
+    """markdown-it core rule: move a trailing {#anchor} on a heading into its id attribute."""
+    tokens = state.tokens
+    for i, token in enumerate(tokens):
+        if token.type != 'heading_open':
+            continue
+        inline = tokens[i + 1]
+        match = _RE_ANCHOR_SUFFIX.search(inline.content)
+        if match and inline.children and inline.children[-1].type == 'text':
+            token.attrSet('id', match.group(1))
+            last = inline.children[-1]
+            last.content = _RE_ANCHOR_SUFFIX.sub('', last.content)
 
-    # Remove remaining {#anchor} tags from headers (ones without anchors processed above)
-    html = re.sub(r'\s*\{#[^}]+\}', '', html)
 
-    # Process images FIRST (before other conversions)
-    # ![alt text](path) -> <figure><img src="..." alt="..."></figure>
-    def replace_image(match):
-        alt_text = match.group(1)
-        img_path_str = match.group(2)
+def _figure_paragraph_rule(state) -> None:
+    """
+    markdown-it core rule: keep images (rendered as <figure>) out of <p>.
+    A paragraph holding only an image is unwrapped; an image on its own line at the start of
+    a paragraph (e.g. followed by its caption line) is moved out in front of the paragraph.
+    """
+    tokens = state.tokens
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token.type == 'paragraph_open':
+            inline = tokens[i + 1]
+            children = inline.children or []
+            if len(children) == 1 and children[0].type == 'image':
+                token.hidden = True
+                tokens[i + 2].hidden = True
+                children[0].meta['standalone'] = True
+            elif len(children) > 2 and children[0].type == 'image' and children[1].type == 'softbreak':
+                image = children[0]
+                image.meta['standalone'] = True
+                inline.children = children[2:]
+                # A block-level inline token renders its children without a wrapper
+                tokens.insert(i, Token('inline', '', 0, level=token.level, children=[image], block=True))
+                i += 1
+                continue  # Look at the rest of the paragraph again
+        i += 1
+
+
+def _blockquote_break_rule(state) -> None:
+    """markdown-it core rule: mark soft line breaks inside blockquotes to render as <br/>."""
+    depth = 0
+    for token in state.tokens:
+        if token.type == 'blockquote_open':
+            depth += 1
+        elif token.type == 'blockquote_close':
+            depth -= 1
+        elif depth and token.type == 'inline':
+            for child in token.children or []:
+                if child.type == 'softbreak':
+                    child.meta['blockquote'] = True
+
+
+def _render_softbreak(self, tokens, idx, options, env) -> str:
+    """markdown-it render rule: keep blockquote lines apart, like the regex converter does."""
+    if tokens[idx].meta.get('blockquote'):
+        return '<br/>'
+    return self.softbreak(tokens, idx, options, env)
+
+
+def _inline_plain_text(tokens) -> str:
+    """
+    Flatten inline tokens to plain text for an alt attribute.
+    Unlike renderInlineAsText, raw inline HTML and code spans are kept (render_figure escapes them).
+    """
+    parts = []
+    for token in tokens:
+        if token.type in ('text', 'html_inline', 'code_inline'):
+            parts.append(token.content)
+        elif token.type == 'image':
+            parts.append(_inline_plain_text(token.children or []))
+        elif token.type in ('softbreak', 'hardbreak'):
+            parts.append('\n')
+    return ''.join(parts)
+
+
+def _render_image(self, tokens, idx, options, env) -> str:
+    """markdown-it render rule: embed images as data URIs inside <figure>."""
+    token = tokens[idx]
+    alt_text = _inline_plain_text(token.children or [])
+    figure = render_figure(alt_text, unquote(token.attrGet('src') or ''), env.get('base_path'), env.get('data_uris'))
+    return figure + '\n' if token.meta.get('standalone') else figure
+
+
+_markdown_parser = None
+
+
+def _get_markdown_parser():
+    """Build the markdown-it parser once per process."""
+    global _markdown_parser
+    if _markdown_parser is None:
+        md = MarkdownIt('commonmark', {'html': True}).enable('table')
+        # Keep in-page anchors (TOC links) verbatim so they match the raw heading ids
+        normalize_link = md.normalizeLink
+        md.normalizeLink = lambda url: url if url.startswith('#') else normalize_link(url)
+        md.core.ruler.push('heading_anchors', _heading_anchor_rule)
+        md.core.ruler.push('figure_paragraphs', _figure_paragraph_rule)
+        md.core.ruler.push('blockquote_breaks', _blockquote_break_rule)
+        md.add_render_rule('image', _render_image)
+        md.add_render_rule('softbreak', _render_softbreak)
+        _markdown_parser = md
+    return _markdown_parser
+
+
+def render_markdown(markdown: str, base_path: Path = None, data_uris: dict[Path, str] = None) -> str:
+    """Convert markdown to HTML in a single parse/render pass with markdown-it."""
+    html = process_image_columns(markdown, base_path, data_uris, separate_blocks=True)
+    return _get_markdown_parser().render(html, {'base_path': base_path, 'data_uris': data_uris})
+
+
+def _header_with_anchor(match: re.Match) -> str:
+    """Regex callback: turn '## Title {#id}' into <h2 id="id">Title</h2>."""
+    hashes = match.group(1)
+    title = match.group(2)
+    anchor_match = _RE_ANCHOR_ID.search(title)
+    if anchor_match:
+        anchor = anchor_match.group(1)
+        title_clean = _RE_ANCHOR_TAG.sub('', title)
+        level = len(hashes)
+        return f'<h{level} id="{anchor}">{title_clean}</h{level}>'
+    return match.group(0)  # Return unchanged if no anchor
+
+
+def _table_cells(row: str, tag: str) -> list[str]:
+    """
+    Render the cells of one | a | b | table row as <th>/<td> elements.
+    Callers only pass rows that start and end with '|'.
+    """
+    return [f'<{tag}>{cell.strip()}</{tag}>' for cell in row.split('|')[1:-1]]
 
-        if base_path:
-            img_path = base_path / img_path_str
-        else:
-            img_path = Path(img_path_str)
 
-        if img_path.exists():
-            data_uri = image_to_data_uri(img_path)
-            if data_uri:
-                return f'<figure><img src="{data_uri}" alt="{alt_text}" style="max-width:100%; height:auto;"/><figcaption>{alt_text}</figcaption></figure>'
+def _join_blockquotes(html: str) -> str:
+    """Collapse each run of '> ' lines into one <blockquote> line, joining the lines with <br/>."""
+    result = []
+    blockquote_content = []
+    for line in html.split('\n'):
+        stripped = line.strip()
+        if stripped.startswith('> '):
+            blockquote_content.append(stripped[2:])
+            continue
+        if blockquote_content:
+            result.append('<blockquote>' + '<br/>'.join(blockquote_content) + '</blockquote>')
+            blockquote_content.clear()
+        result.append(line)
+    if blockquote_content:
+        result.append('<blockquote>' + '<br/>'.join(blockquote_content) + '</blockquote>')
+    return '\n'.join(result)
 
-        # Return placeholder if image not found
-        return f'<figure class="missing-image"><div style="background:#f0f0f0; padding:40px; text-align:center; border:1px dashed #ccc;">[Image: {alt_text}]</div></figure>'
 
-    html = re.sub(r'!\[([^\]]*)\]\(([^)]+)\)', replace_image, html)
+def markdown_to_html_internal(markdown: str, base_path: Path = None, data_uris: dict[Path, str] = None) -> str:
+    """Internal: Convert markdown to HTML with full feature support."""
+    html = markdown
 
-    # Process blockquotes (> text)
-    lines = html.split('\n')
-    result_lines = []
-    in_blockquote = False
-    blockquote_content = []
+    # Multi-column image sections and lines with several images
+    html = process_image_columns(html, base_path, data_uris)
 
-    for line in lines:
-        if line.strip().startswith('> '):
-            if not in_blockquote:
-                in_blockquote = True
-                blockquote_content = []
-            blockquote_content.append(line.strip()[2:])
-        else:
-            if in_blockquote:
-                result_lines.append('<blockquote>' + '<br/>'.join(blockquote_content) + '</blockquote>')
-                in_blockquote = False
-                blockquote_content = []
-            result_lines.append(line)
+    # Each pass below is skipped when the text it requires is absent; a substring
+    # test is far cheaper than starting the regex engine over the whole document
+    if '{#' in html:
+        # Process headers with anchors first (extract anchor, create id)
+        html = _RE_HEADER_WITH_ANCHOR.sub(_header_with_anchor, html)
 
-    if in_blockquote:
-        result_lines.append('<blockquote>' + '<br/>'.join(blockquote_content) + '</blockquote>')
+        # Remove remaining {#anchor} tags from headers (ones without anchors processed above)
+        html = _RE_ANCHOR_TAG.sub('', html)
 
-    html = '\n'.join(result_lines)
+    # Process images FIRST (before other conversions)
+    # ![alt text](path) -> <figure><img src="..." alt="..."></figure>
+    if '![' in html:
+        html = _RE_IMG.sub(lambda m: render_figure(m.group(1), m.group(2), base_path, data_uris), html)
+
+    # Blockquotes are joined before the inline passes so emphasis and links can span quote lines
+    if '> ' in html:
+        html = _join_blockquotes(html)
 
     # Headers
-    html = re.sub(r'^### (.+)$', r'<h3>\1</h3>', html, flags=re.MULTILINE)
-    html = re.sub(r'^## (.+)$', r'<h2>\1</h2>', html, flags=re.MULTILINE)
-    html = re.sub(r'^# (.+)$', r'<h1>\1</h1>', html, flags=re.MULTILINE)
+    if '# ' in html:
+        html = _RE_H3.sub(r'<h3>\1</h3>', html)
+        html = _RE_H2.sub(r'<h2>\1</h2>', html)
+        html = _RE_H1.sub(r'<h1>\1</h1>', html)
 
     # Bold and italic (be careful with order)
-    html = re.sub(r'\*\*\*(.+?)\*\*\*', r'<strong><em>\1</em></strong>', html)
-    html = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html)
-    html = re.sub(r'(?<!\*)\*([^*\n]+?)\*(?!\*)', r'<em>\1</em>', html)
+    if '*' in html:
+        html = _RE_BOLD_ITALIC.sub(r'<strong><em>\1</em></strong>', html)
+        html = _RE_BOLD.sub(r'<strong>\1</strong>', html)
+        html = _RE_ITALIC.sub(r'<em>\1</em>', html)
 
     # Links [text](url)
-    html = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', r'<a href="\2">\1</a>', html)
+    if '](' in html:
+        html = _RE_LINK.sub(r'<a href="\2">\1</a>', html)
 
     # Horizontal rules
-    html = re.sub(r'^---+$', '<hr/>', html, flags=re.MULTILINE)
-
-    # Process markdown tables
-    def convert_table(table_lines):
-        """Convert markdown table lines to HTML table."""
-        if len(table_lines) < 2:
-            return '\n'.join(table_lines)
-
-        html_parts = ['<table>']
-
-        # Process header
-        header = table_lines[0]
-        cells = [c.strip() for c in header.split('|')[1:-1]]  # Remove empty first/last from split
-        if not cells:
-            cells = [c.strip() for c in header.split('|') if c.strip()]
-
-        html_parts.append('<thead><tr>')
-        for cell in cells:
-            html_parts.append(f'<th>{cell}</th>')
-        html_parts.append('</tr></thead>')
-
-        # Skip separator line (index 1) and process body
-        html_parts.append('<tbody>')
-        for line in table_lines[2:]:
-            cells = [c.strip() for c in line.split('|')[1:-1]]
-            if not cells:
-                cells = [c.strip() for c in line.split('|') if c.strip()]
-            if cells:
-                html_parts.append('<tr>')
-                for cell in cells:
-                    html_parts.append(f'<td>{cell}</td>')
-                html_parts.append('</tr>')
-        html_parts.append('</tbody></table>')
-
-        return '\n'.join(html_parts)
-
-    # Find and convert tables
-    lines = html.split('\n')
-    result_lines = []
-    table_buffer = []
-    in_table = False
-
-    for line in lines:
-        stripped = line.strip()
-        # Check if line looks like a table row (starts and ends with |, or contains |)
-        is_table_line = stripped.startswith('|') and stripped.endswith('|')
-        is_separator = re.match(r'^\|[\s\-:|]+\|$', stripped)
-
-        if is_table_line or is_separator:
-            in_table = True
-            table_buffer.append(stripped)
-        else:
-            if in_table and table_buffer:
-                # End of table, convert it
-                result_lines.append(convert_table(table_buffer))
-                table_buffer = []
-                in_table = False
-            result_lines.append(line)
+    if '---' in html:
+        html = _RE_HR.sub('<hr/>', html)
 
-    # Handle table at end of document
-    if table_buffer:
-        result_lines.append(convert_table(table_buffer))
-
-    html = '\n'.join(result_lines)
-
-    # Process lists (both unordered and ordered)
+    # Group tables and lists in a single pass over the lines
     lines = html.split('\n')
-    in_ul = False
-    in_ol = False
     result = []
+    table_parts = []  # HTML of the open table, built row by row
+    table_header = None  # raw header row while a table is open
+    table_rows = 0
+    list_tag = None  # 'ul' or 'ol' while inside a list
+
+    def close_blocks(kind):
+        """Close any open block that the current line (of the given kind) doesn't continue."""
+        nonlocal list_tag, table_header
+        if table_header is not None and kind != 'table':
+            if table_rows < 2:
+                result.append(table_header)  # a lone | row is not a table
+            else:
+                table_parts.append('</tbody></table>')
+                result.append('\n'.join(table_parts))
+            table_parts.clear()
+            table_header = None
+        if list_tag and kind != list_tag:
+            result.append(f'</{list_tag}>')
+            list_tag = None
 
     for line in lines:
         stripped = line.strip()
 
-        # Check for unordered list
-        if stripped.startswith('- ') or stripped.startswith('* '):
-            if in_ol:
-                result.append('</ol>')
-                in_ol = False
-            if not in_ul:
-                result.append('<ul>')
-                in_ul = True
-            content = stripped[2:]
-            result.append(f'<li>{content}</li>')
-        # Check for ordered list (1. 2. etc)
-        elif re.match(r'^\d+\.\s', stripped):
-            if in_ul:
-                result.append('</ul>')
-                in_ul = False
-            if not in_ol:
-                result.append('<ol>')
-                in_ol = True
-            content = re.sub(r'^\d+\.\s', '', stripped)
+        # Table row (| ... |), unordered (- / *) or ordered (1.) list item
+        if stripped.startswith('|') and stripped.endswith('|'):
+            kind = 'table'
+        elif stripped.startswith('- ') or stripped.startswith('* '):
+            kind = 'ul'
+        elif _RE_OL_ITEM.match(stripped):
+            kind = 'ol'
+        else:
+            kind = None
+
+        close_blocks(kind)
+
+        if kind == 'table':
+            table_rows = table_rows + 1 if table_header is not None else 1
+            if table_rows == 1:
+                table_header = stripped
+                table_parts.extend(['<table>', '<thead><tr>', *_table_cells(stripped, 'th'), '</tr></thead>', '<tbody>'])
+            elif table_rows > 2 or not _RE_TABLE_SEP.match(stripped):
+                cells = _table_cells(stripped, 'td')
+                if cells:
+                    table_parts.extend(['<tr>', *cells, '</tr>'])
+        elif kind == 'ul' or kind == 'ol':
+            if list_tag is None:
+                result.append(f'<{kind}>')
+                list_tag = kind
+            content = stripped[2:] if kind == 'ul' else _RE_OL_ITEM.sub('', stripped)
             result.append(f'<li>{content}</li>')
         else:
-            if in_ul:
-                result.append('</ul>')
-                in_ul = False
-            if in_ol:
-                result.append('</ol>')
-                in_ol = False
             result.append(line)
 
-    if in_ul:
-        result.append('</ul>')
-    if in_ol:
-        result.append('</ol>')
+    # Close blocks still open at the end of the document
+    close_blocks(None)
 
     html = '\n'.join(result)
 
@@ -362,7 +590,7 @@ def markdown_to_html_internal(markdown: str, base_path: Path = None) -> str:
         if not stripped:
             continue
         # Skip if already starts with an HTML tag
-        if re.match(r'^<(h[1-6]|ul|ol|li|blockquote|figure|hr|p|div|table)', stripped, re.IGNORECASE):
+        if _RE_BLOCK_TAG.match(stripped):
             processed_blocks.append(stripped)
         elif stripped.startswith('<'):
             processed_blocks.append(stripped)
@@ -375,68 +603,12 @@ def markdown_to_html_internal(markdown: str, base_path: Path = None) -> str:
     return html
 
 
-def generate_html_report(
-    title: str,
-    content: str,
-    images: list[dict],
-    diagrams: list[dict],
-    metadata: dict = None,
-    base_path: Path = None
-) -> str:
-    """Generate full HTML report."""
-
-    metadata = metadata or {}
-    date = metadata.get('date', datetime.now().strftime('%Y-%m-%d'))
-    author = metadata.get('author', 'Research Report Generator')
-
-    # Convert markdown content to HTML (with base_path for image resolution)
-    content_html = markdown_to_html(content, base_path)
-
-    # Build images section
-    images_html = ''
-    if images:
-        images_html = '<div class="images-section"><h2>Figures</h2>'
-        for i, img in enumerate(images):
-            img_path = Path(img['path'])
-            if img_path.exists():
-                if img_path.suffix.lower() == '.svg':
-                    data_uri = svg_to_data_uri(img_path)
-                    images_html += f'''
-                    <figure>
-                        <img src="{data_uri}" alt="{img.get('caption', '')}"/>
-                        <figcaption>Figure {i+1}: {img.get('caption', '')}</figcaption>
-                    </figure>
-                    '''
-        images_html += '</div>'
-
-    # Build diagrams section
-    diagrams_html = ''
-    if diagrams:
-        diagrams_html = '<div class="diagrams-section"><h2>Diagrams</h2>'
-        for i, diag in enumerate(diagrams):
-            diag_path = Path(diag['path'])
-            if diag_path.exists():
-                if diag_path.suffix.lower() == '.svg':
-                    data_uri = svg_to_data_uri(diag_path)
-                    diagrams_html += f'''
-                    <figure>
-                        <img src="{data_uri}" alt="{diag.get('caption', '')}"/>
-                        <figcaption>Diagram {i+1}: {diag.get('caption', '')}</figcaption>
-                    </figure>
-                    '''
-        diagrams_html += '</div>'
-
-    html = f'''<!DOCTYPE html>
-<html lang="ja">
-<head>
-    <meta charset="UTF-8">
-    <title>{title}</title>
-    <style>
-        @page {{
+# Report stylesheet: inlined into standalone HTML, parsed once per process for PDFs
+_STYLE_CSS = '''        @page {
             size: A4;
             margin: 1.2cm 1.5cm;
-        }}
-        body {{
+        }
+        body {
             font-family: "Inter", "Helvetica Neue", "Arial", "Hiragino Kaku Gothic Pro", "Yu Gothic", sans-serif;
             line-height: 1.8;
             color: #1a1a1a;
@@ -444,16 +616,16 @@ def generate_html_report(
             margin: 0 auto;
             padding: 16px;
             font-size: 20px;
-        }}
-        h1 {{
+        }
+        h1 {
             color: #111;
             border-bottom: 3px solid #2563eb;
             padding-bottom: 12px;
             font-size: 38px;
             font-weight: 700;
             margin-bottom: 24px;
-        }}
-        h2 {{
+        }
+        h2 {
             color: #1f2937;
             border-left: 4px solid #2563eb;
             padding-left: 16px;
@@ -461,244 +633,439 @@ def generate_html_report(
             margin-bottom: 16px;
             font-size: 30px;
             font-weight: 600;
-        }}
-        h3 {{
+        }
+        h3 {
             color: #374151;
             font-size: 24px;
             font-weight: 600;
             margin-top: 24px;
-        }}
-        .metadata {{
+        }
+        .metadata {
             color: #7f8c8d;
             font-size: 18px;
             margin-bottom: 30px;
-        }}
-        p {{
+        }
+        p {
             margin: 16px 0;
             text-align: justify;
             font-size: 20px;
-        }}
-        ul {{
+        }
+        ul {
             margin: 16px 0;
             padding-left: 28px;
-        }}
-        li {{
+        }
+        li {
             margin: 8px 0;
             font-size: 20px;
-        }}
-        figure {{
+        }
+        figure {
             margin: 20px 0;
             text-align: center;
             page-break-inside: avoid;
-        }}
-        figure img {{
+        }
+        figure img {
             max-width: 100%;
             height: auto;
             border: 1px solid #ddd;
             border-radius: 4px;
-        }}
-        figcaption {{
+        }
+        figcaption {
             font-size: 16px;
             color: #666;
             margin-top: 8px;
             font-style: italic;
-        }}
-        .images-section, .diagrams-section {{
+        }
+        .images-section, .diagrams-section {
             margin-top: 40px;
             page-break-before: always;
-        }}
-        strong {{
+        }
+        strong {
             color: #2c3e50;
-        }}
-        blockquote {{
+        }
+        blockquote {
             margin: 24px 0;
             padding: 16px 24px;
             background: #f8f9fa;
             border-left: 4px solid #2563eb;
             font-style: italic;
             color: #4b5563;
-        }}
-        hr {{
+        }
+        hr {
             border: none;
             border-top: 1px solid #e5e7eb;
             margin: 32px 0;
-        }}
-        ol {{
+        }
+        ol {
             margin: 16px 0;
             padding-left: 28px;
-        }}
-        ol li {{
+        }
+        ol li {
             margin: 8px 0;
-        }}
-        a {{
+        }
+        a {
             color: #2563eb;
             text-decoration: none;
-        }}
-        table {{
+        }
+        table {
             width: 100%;
             border-collapse: collapse;
             margin: 20px 0;
             font-size: 14px;
-        }}
-        th, td {{
+        }
+        th, td {
             border: 1px solid #e5e7eb;
             padding: 12px;
             text-align: left;
-        }}
-        th {{
+        }
+        th {
             background-color: #f8fafc;
             font-weight: 600;
             color: #1f2937;
-        }}
-        tr:nth-child(even) {{
+        }
+        tr:nth-child(even) {
             background-color: #f9fafb;
-        }}
-        .content > h1:first-child {{
+        }
+        .content > h1:first-child {
             display: none;
-        }}
+        }
         /* Table of Contents Styles */
-        .toc {{
+        .toc {
             background: #f8fafc;
             border: 1px solid #e2e8f0;
             border-radius: 8px;
             padding: 20px 24px;
             margin: 20px 0 32px 0;
-        }}
-        .toc h2 {{
+        }
+        .toc h2 {
             margin-top: 0;
             border-left: none;
             padding-left: 0;
             font-size: 20px;
             color: #1f2937;
-        }}
-        .toc ul {{
+        }
+        .toc ul {
             list-style: none;
             padding-left: 0;
             margin: 12px 0 0 0;
-        }}
-        .toc li {{
+        }
+        .toc li {
             margin: 6px 0;
             font-size: 14px;
-        }}
-        .toc li ul {{
+        }
+        .toc li ul {
             padding-left: 20px;
             margin: 4px 0;
-        }}
-        .toc li ul li {{
+        }
+        .toc li ul li {
             font-size: 13px;
             color: #4b5563;
-        }}
-        .toc a {{
+        }
+        .toc a {
             color: #2563eb;
             text-decoration: none;
-        }}
-        .toc a:hover {{
+        }
+        .toc a:hover {
             text-decoration: underline;
-        }}
+        }
         /* Multi-column image layout */
-        .image-columns {{
+        .image-columns {
             display: flex;
             flex-wrap: wrap;
             gap: 16px;
             justify-content: center;
             margin: 20px 0;
-        }}
-        .image-columns .column-item {{
+        }
+        .image-columns .column-item {
             flex: 1 1 calc(50% - 16px);
             max-width: calc(50% - 8px);
             margin: 0;
-        }}
-        .image-columns .column-item img {{
+        }
+        .image-columns .column-item img {
             max-height: 400px;
             width: auto;
             max-width: 100%;
             object-fit: contain;
             border: none;
-        }}
-        .image-columns figcaption {{
+        }
+        .image-columns figcaption {
             font-size: 11px;
             text-align: center;
-        }}
+        }
         /* Tall image constraint */
-        figure img {{
+        figure img {
             max-height: 500px;
             width: auto;
             object-fit: contain;
-        }}
-    </style>
-</head>
-<body>
-    <h1>{title}</h1>
-    <div class="metadata">
-        <p>Date: {date} | Author: {author}</p>
-    </div>
-    <div class="content">
-        {content_html}
-    </div>
-    {diagrams_html}
-    {images_html}
-</body>
-</html>'''
+        }
+'''
+
+_CSS_BLOCK = f'    <style>\n{_STYLE_CSS}    </style>\n'
+
+# Static pieces of the report document around the per-report slots
+_DOCTYPE_HEAD = '<!DOCTYPE html>\n<html lang="ja">\n<head>\n    <meta charset="UTF-8">\n'
+_BODY_OPEN = '</head>\n<body>\n'
+_CONTENT_OPEN = '    <div class="content">\n        '
+_CONTENT_CLOSE = '\n    </div>\n    '
+_BODY_CLOSE = '\n</body>\n</html>'
+
+
+def append_figure_section(parts: list[str], items: list[dict], css_class: str, heading: str,
+                          label: str, data_uris: dict[Path, str] = None):
+    """Append a numbered section of the SVG figures in items to parts (nothing if items is empty)."""
+    if not items:
+        return
+    parts.append(f'<div class="{css_class}"><h2>{heading}</h2>')
+    for i, item in enumerate(items):
+        item_path = Path(item['path'])
+        if item_path.exists():
+            if item_path.suffix.lower() == '.svg':
+                data_uri = get_data_uri(item_path, data_uris)
+                caption = escape(str(item.get('caption', '')))
+                parts.append(f'''
+                    <figure>
+                        <img src="{data_uri}" alt="{caption}"/>
+                        <figcaption>{label} {i+1}: {caption}</figcaption>
+                    </figure>
+                    ''')
+    parts.append('</div>')
 
-    return html
 
+def generate_html_report(
+    title: str,
+    content: str,
+    images: list[dict],
+    diagrams: list[dict],
+    metadata: dict = None,
+    base_path: Path = None,
+    embed_images: bool = False,
+    inline_css: bool = True
+) -> str:
+    """
+    Generate full HTML report.
+    With inline_css=False the <style> block is left out; pass get_pdf_style() to generate_pdf instead.
+    """
 
-def generate_pdf(html_content: str, output_path: Path) -> bool:
-    """Generate PDF from HTML content."""
+    metadata = metadata or {}
+    date = escape(str(metadata.get('date', datetime.now().strftime('%Y-%m-%d'))))
+    author = escape(str(metadata.get('author', 'Research Report Generator')))
+
+    # Read and encode every referenced image up front, in parallel
+    # (or just link the files when the PDF renderer can load them itself)
+    image_refs = find_image_paths(content, base_path)
+    section_paths = [Path(item['path']) for item in (*images, *diagrams)]
+    load_images = prefetch_data_uris if embed_images else link_image_files
+    data_uris = load_images([*image_refs, *(p for p in section_paths if p.suffix.lower() == '.svg')])
+
+    # Convert markdown content to HTML (with base_path for image resolution)
+    content_html = markdown_to_html(content, base_path, data_uris=data_uris)
+
+    # Write every piece into one list and join once at the end, so the figure
+    # sections (which can hold megabytes of base64) are never copied twice
+    title_text = escape(str(title))
+    parts = [
+        _DOCTYPE_HEAD,
+        f'    <title>{title_text}</title>\n',
+        _CSS_BLOCK if inline_css else '',
+        _BODY_OPEN,
+        f'    <h1>{title_text}</h1>\n',
+        f'    <div class="metadata">\n        <p>Date: {date} | Author: {author}</p>\n    </div>\n',
+        _CONTENT_OPEN,
+        content_html,
+        _CONTENT_CLOSE,
+    ]
+    append_figure_section(parts, diagrams, 'diagrams-section', 'Diagrams', 'Diagram', data_uris)
+    parts.append('\n    ')
+    append_figure_section(parts, images, 'images-section', 'Figures', 'Figure', data_uris)
+    parts.append(_BODY_CLOSE)
+    return ''.join(parts)
+
+
+_pdf_style = None
+
+
+def get_pdf_style():
+    """
+    Build the font configuration and parse _STYLE_CSS once per process.
+    Returns (font_config, stylesheet) for reuse across generate_pdf calls.
+    """
+    global _pdf_style
+    check_weasyprint_version()
+    if _pdf_style is None:
+        font_config = FontConfiguration()
+        _pdf_style = (font_config, CSS(string=_STYLE_CSS, font_config=font_config))
+    return _pdf_style
+
+
+def check_weasyprint_version():
+    """Raise RuntimeError if the installed weasyprint is too old for this script."""
+    if WEASYPRINT_TOO_OLD:
+        raise RuntimeError(f"weasyprint {weasyprint.__version__} is too old; "
+                           f"version {WEASYPRINT_MIN_VERSION} or newer is required")
+
+
+def generate_pdf(html_content: str, output_path: Path, base_path: Path = None,
+                 font_config=None, stylesheet=None) -> bool:
+    """
+    Generate PDF from HTML content, resolving relative URLs against base_path.
+    font_config and stylesheet (see get_pdf_style) are reused instead of rebuilt per document.
+    """
     if not WEASYPRINT_AVAILABLE:
         print("Warning: weasyprint not available, saving HTML instead", file=sys.stderr)
         html_path = output_path.with_suffix('.html')
-        html_path.write_text(html_content)
+        html_path.write_text(html_content, encoding='utf-8')
         return False
 
+    check_weasyprint_version()
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    HTML(string=html_content).write_pdf(output_path)
+    base_url = str(base_path) if base_path else None
+    stylesheets = [stylesheet] if stylesheet is not None else None
+    HTML(string=html_content, base_url=base_url).write_pdf(
+        output_path, stylesheets=stylesheets, font_config=font_config, **_PDF_OPTIONS)
     return True
 
 
-def main():
-    parser = argparse.ArgumentParser(description='Generate PDF research report')
-    parser.add_argument('--title', '-t', required=True, help='Report title')
-    parser.add_argument('--content', '-c', required=True, help='Markdown content or path to .md file')
-    parser.add_argument('--images', '-i', default='[]', help='JSON array of image objects')
-    parser.add_argument('--diagrams', '-d', default='[]', help='JSON array of diagram objects')
-    parser.add_argument('--output', '-o', required=True, help='Output PDF path')
-    parser.add_argument('--author', default='Research Report Generator', help='Author name')
-
-    args = parser.parse_args()
-
+def build_report(title: str, content: str, output: str, images: list[dict] = None,
+                 diagrams: list[dict] = None, author: str = 'Research Report Generator',
+                 embed_images: bool = False) -> tuple[Path, bool]:
+    """
+    Render one report to output; content is markdown or a path to a .md file.
+    Returns (output_path, success) where success is False if HTML was written instead.
+    """
     # Load content
-    content_path = Path(args.content)
+    content_path = Path(content)
     base_path = None
     if content_path.exists():
-        content = content_path.read_text()
+        content = content_path.read_text(encoding='utf-8')
         base_path = content_path.parent  # Use content file's directory as base for image paths
-    else:
-        content = args.content
-
-    # Parse images and diagrams
-    images = json.loads(args.images)
-    diagrams = json.loads(args.diagrams)
 
     # Generate HTML
     html = generate_html_report(
-        title=args.title,
+        title=title,
         content=content,
-        images=images,
-        diagrams=diagrams,
-        metadata={'author': args.author},
-        base_path=base_path
+        images=images or [],
+        diagrams=diagrams or [],
+        metadata={'author': author},
+        base_path=base_path,
+        # weasyprint loads linked files itself; the HTML fallback must stay self-contained
+        embed_images=embed_images or not WEASYPRINT_AVAILABLE,
+        inline_css=not WEASYPRINT_AVAILABLE
     )
 
     # Generate PDF
-    output_path = Path(args.output)
-    success = generate_pdf(html, output_path)
+    output_path = Path(output)
+    if not WEASYPRINT_AVAILABLE:
+        return output_path, generate_pdf(html, output_path, base_path)
+    font_config, stylesheet = get_pdf_style()
+    return output_path, generate_pdf(html, output_path, base_path, font_config, stylesheet)
+
+
+def _build_report_worker(spec: dict) -> tuple[Path, bool]:
+    """Process-pool entry point for one manifest entry."""
+    return build_report(**spec)
+
+
+_MANIFEST_REQUIRED_KEYS = frozenset({'title', 'content', 'output'})
+_MANIFEST_KEYS = _MANIFEST_REQUIRED_KEYS | {'images', 'diagrams', 'author', 'embed_images'}
+
+
+def manifest_entry_error(spec) -> str | None:
+    """Describe what is wrong with a manifest entry, or None if build_report can take it."""
+    if not isinstance(spec, dict):
+        return 'entry is not an object'
+    missing = _MANIFEST_REQUIRED_KEYS - spec.keys()
+    if missing:
+        return f"missing keys: {', '.join(sorted(missing))}"
+    unknown = spec.keys() - _MANIFEST_KEYS
+    if unknown:
+        return f"unknown keys: {', '.join(sorted(unknown))}"
+    return None
+
 
+def build_reports(specs: list[dict], max_workers: int = None, embed_images: bool = False) -> int:
+    """
+    Render manifest entries in parallel, one worker process per report.
+    weasyprint keeps memory across renders, so each worker exits after a single report.
+    Each entry's result or error is printed as soon as it finishes; returns the number of failed entries.
+    """
+    failures = 0
+    valid = []
+    for i, spec in enumerate(specs):
+        error = manifest_entry_error(spec)
+        if error:
+            print(f"Failed to build manifest entry {i}: {error}", file=sys.stderr)
+            failures += 1
+        else:
+            valid.append((i, {'embed_images': embed_images, **spec}))
+    if not valid:
+        return failures
+
+    # max_tasks_per_child is new in Python 3.11; older versions reuse workers
+    pool_kwargs = {'max_tasks_per_child': 1} if sys.version_info >= (3, 11) else {}
+    max_workers = min(max_workers or os.cpu_count() or 1, len(valid))
+    with ProcessPoolExecutor(max_workers=max_workers, **pool_kwargs) as executor:
+        futures = {executor.submit(_build_report_worker, spec): i for i, spec in valid}
+        for future in as_completed(futures):
+            try:
+                output_path, success = future.result()
+            except Exception as e:
+                print(f"Failed to build manifest entry {futures[future]}: {e}", file=sys.stderr)
+                failures += 1
+            else:
+                print_result(output_path, success)
+    return failures
+
+
+def print_result(output_path: Path, success: bool):
+    """Report where a rendered report was written."""
     if success:
         print(f"Generated PDF: {output_path}")
     else:
         print(f"Generated HTML (weasyprint not available): {output_path.with_suffix('.html')}")
 
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate PDF research report')
+    parser.add_argument('--title', '-t', help='Report title')
+    parser.add_argument('--content', '-c', help='Markdown content or path to .md file')
+    parser.add_argument('--images', '-i', default='[]', help='JSON array of image objects')
+    parser.add_argument('--diagrams', '-d', default='[]', help='JSON array of diagram objects')
+    parser.add_argument('--output', '-o', help='Output PDF path')
+    parser.add_argument('--author', default='Research Report Generator', help='Author name')
+    parser.add_argument('--embed-images', action='store_true',
+                        help='Embed images as data URIs even when rendering the PDF')
+    parser.add_argument('--manifest', '-m',
+                        help='JSON file with an array of reports ({"title", "content", "output", '
+                             '"images", "diagrams", "author"}) to render in parallel')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Parallel report workers for --manifest (default: CPU count)')
+
+    args = parser.parse_args()
+
+    try:
+        check_weasyprint_version()
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if args.manifest:
+        specs = json.loads(Path(args.manifest).read_text(encoding='utf-8'))
+        return 1 if build_reports(specs, args.workers, args.embed_images) else 0
+
+    missing = [f'--{name}' for name in ('title', 'content', 'output') if getattr(args, name) is None]
+    if missing:
+        parser.error(f"the following arguments are required: {', '.join(missing)}")
+
+    output_path, success = build_report(
+        title=args.title,
+        content=args.content,
+        output=args.output,
+        images=json.loads(args.images),
+        diagrams=json.loads(args.diagrams),
+        author=args.author,
+        embed_images=args.embed_images
+    )
+    print_result(output_path, success)
+
     return 0
 
 